@@ -4,15 +4,17 @@
 # Instead of spoiling the "official" WORDLE, here is a clone of it that you can
 # play as often as you want: http://foldr.moe/hello-wordl/ .
 #
-# Currently this is a very naive solver with a runtime of O(N^3) where N is the 
-# number of words of the dictionary. For every possible answer and every possible
-# guess, we count how many of the other possible answers would be eliminated by
-# that guess.
+# For every possible guess, the solver computes the expected number of possible
+# answers that would remain feasible after making that guess, and picks the guess
+# that minimizes it. Originally this was a very naive solver with a runtime of O(N^3)
+# where N is the number of words of the dictionary: for every possible answer and
+# every possible guess, it counted how many of the other possible answers would be
+# eliminated by that guess.
 #
-# The dictionary on my system contains 4567 words, so this means that this program
-# would require 95 billion iterations to compute the best first word. To make
-# matters worse, the function that evalues a guess (called "score") is itself very
-# slow. There are many opportunities for optimization.
+# The dictionary on my system contains 4567 words, so this meant that the program
+# would require 95 billion iterations to compute the best first word. Now we score
+# each guess against all answers at once, and count how many answers produce each
+# of the 243 possible results (see evaluate_guess), which brings this down to O(N^2).
 #
 # This program is meant to be used from within ipython. After starting ipython:
 #
@@ -24,6 +26,9 @@
 #
 #     solver = WordlSolver(words)
 #
+# The solver starts by working out the best first guess, and keeps its current
+# suggestion in solver.next_guess.
+#
 # Suppose your initial guess was 'SLANT' and the result was 's.a..' (meaning that
 # the 'S' and 'A' appear in the answer but the other letters do not; i.e. "S" and "A"
 # are yellow and the other letters are grey). You can tell the solver about this result:
@@ -77,82 +82,433 @@
 # tqdm is a nice progress-bar library. Install it with "pip install tqdm".
 from tqdm import tqdm
 
+# numpy lets us score one guess against every possible answer at once, instead of
+# calling score() in a Python loop.
+import numpy as np
+
+# numba compiles the scoring loop to machine code and runs it on all cores. It is
+# optional, but makes computing the pattern matrix much faster. Install it with
+# "pip install numba".
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# If there is a CUDA GPU and cupy is installed ("pip install cupy-cuda12x"), we
+# compute the pattern matrix there instead, which is faster still.
+try:
+    import cupy
+except ImportError:
+    cupy = None
+
+# Without numba, we spread the scoring over all cores with a process pool instead.
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 # Returns the result of guessing 'guess' when the true answer is 'answer'.
-# "Green" letters are indicated in upper case in the result, yellow ones in lower case.
-# Non-matching letters are replaced with "."
+# Each letter of the guess is either grey (not in the answer), yellow (in the
+# answer, but elsewhere) or green (in the right place). Since there are only 3^5 = 243
+# possible results, we encode them as an integer in base 3, with the first letter as
+# the most significant digit. Use decode_pattern() to turn that back into a string,
+# where "green" letters are indicated in upper case, yellow ones in lower case, and
+# non-matching letters are replaced with "."
 #
-# score("SLANT", "SQUID") returns "S...."
-# score("CILIA", "VALID") returns "..LIa"
+# decode_pattern(score("SLANT", "SQUID"), "SLANT") returns "S...."
+# decode_pattern(score("CILIA", "VALID"), "CILIA") returns "..LIa"
+
+GREY, YELLOW, GREEN = 0, 1, 2
+NUM_PATTERNS = 3**5
 
-from collections import defaultdict
+# The number of guesses that score_matrix scores together against each answer. The
+# whole matrix is far too big for the cache, so rather than streaming all of the
+# answers through once per guess, we stream them through once per block of guesses.
+GUESS_BLOCK = 64
+
+# The number of threads in each block of gpu_pattern_matrix's kernel.
+GPU_BLOCK_SIZE = 256
+
+# Starting a process pool takes a while, so we only do it for matrices at least this big.
+PARALLEL_MIN_SIZE = 1_000_000
+
+# Forking a process that already has threads running (numba's, for instance) can
+# hang, so where we can, the pool starts its workers from a fresh server process.
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    POOL_START_METHOD = 'forkserver'
+else:
+    POOL_START_METHOD = None
+
+# Guesses whose expected number of remaining words differ by less than this are tied.
+TIE_EPSILON = 1e-9
+
+# The same (guess, answer) pairs come up again and again from one game to the next,
+# so we remember the results. Each cached entry costs on the order of 100 bytes, so
+# we cap the cache size rather than letting it grow to all N^2 pairs.
+from functools import lru_cache
+@lru_cache(maxsize=2_000_000)
 def score(guess, answer):
     # The scoring function is in the inner loop of the solver, so it is ripe for
     # optimization. This function would be trivial were it not for the case of
-    # repeated letters in the guess. It might be worth checking for that situation
-    # and using a faster function in that case.
-    result = ["."]*5
-    lettercount=defaultdict(int)
+    # repeated letters in the guess, so we check for that situation and use a
+    # faster method when there are none (which is true for most words).
+    #
+    # We work on the character codes, and count letters in a fixed array of 26
+    # slots rather than a dictionary. Words may be given as str or bytes.
+    if isinstance(guess, str):
+        guess = guess.encode()
+    if isinstance(answer, str):
+        answer = answer.encode()
+    if len(set(guess)) == 5:
+        # Every letter of the guess is different, so a letter that isn't green is
+        # yellow exactly when it appears anywhere in the answer.
+        answer_letters = set(answer)
+        code = 0
+        for ii in range(5):
+            if guess[ii] == answer[ii]:
+                code = code*3 + GREEN
+            elif guess[ii] in answer_letters:
+                code = code*3 + YELLOW
+            else:
+                code = code*3 + GREY
+        return code
+    state = bytearray(5)
+    lettercount = bytearray(26)
     # Process the exact matches.
     for ii in range(5):
         if guess[ii] == answer[ii]:
-            result[ii] = guess[ii]
+            state[ii] = GREEN
         else:
-            lettercount[answer[ii]] += 1
+            lettercount[answer[ii] - 65] += 1
     # Process the leftover "right letters in wrong position."
+    code = 0
     for ii in range(5):
-        if result[ii] == '.' and lettercount[guess[ii]] > 0:
+        letter = guess[ii] - 65
+        if state[ii] == GREY and lettercount[letter] > 0:
+            state[ii] = YELLOW
+            lettercount[letter] -= 1
+        code = code*3 + state[ii]
+    return code
+
+# Converts a result string like "s.a.." into the integer code returned by score().
+def encode_pattern(result):
+    code = 0
+    for letter in result:
+        if letter == '.':
+            code = code*3 + GREY
+        elif letter.islower():
+            code = code*3 + YELLOW
+        else:
+            code = code*3 + GREEN
+    return code
+
+# Converts an integer code returned by score() back into a result string, for display.
+def decode_pattern(code, guess):
+    result = ["."]*5
+    for ii in reversed(range(5)):
+        code, state = divmod(code, 3)
+        if state == GREEN:
+            result[ii] = guess[ii].upper()
+        elif state == YELLOW:
             result[ii] = guess[ii].lower()
-            lettercount[guess[ii]] -= 1
     return ''.join(result)
 
+# The same as score(), but for a single guess against a whole array of answers.
+# Words are represented as arrays of uint8 character codes (see encode_words), so
+# 'guess_u8' has shape (5,) and 'answers_u8' has shape (N,5). The result is a uint8
+# array of N result codes. If the letter counts of the answers are already known
+# (see letter_counts), pass them as 'answer_counts' to avoid recomputing them.
+#
+# score_batch(encode_words(["DRINK"])[0], encode_words(["DANDY"])) returns [score("DRINK", "DANDY")]
+
+def score_batch(guess_u8, answers_u8, answer_counts=None):
+    if answer_counts is None:
+        answer_counts = letter_counts(answers_u8)
+    # Count the letters of each answer, then remove the ones used up by exact matches.
+    counts = answer_counts.astype(np.int8)
+    letters = guess_u8 - ord('A')
+    greens = (answers_u8 == guess_u8)
+    rows = np.arange(len(answers_u8))
+    for ii in range(5):
+        counts[rows[greens[:, ii]], letters[ii]] -= 1
+    states = greens.astype(np.uint8) * GREEN
+    # Process the leftover "right letters in wrong position," left to right, so that
+    # a repeated letter in the guess only lights up as often as it is in the answer.
+    for ii in range(5):
+        yellow = ~greens[:, ii] & (counts[:, letters[ii]] > 0)
+        states[yellow, ii] = YELLOW
+        counts[yellow, letters[ii]] -= 1
+    s0, s1, s2, s3, s4 = states.T
+    return ((((s0*3)+s1)*3+s2)*3+s3)*3+s4
+
+# Returns a (G,N) uint8 array with the result code of every guess against every answer.
+# As with score_batch, 'answer_counts' may be passed if it is already known.
+#
+# All 243 result codes fit in a single byte, so every way of computing the matrix
+# writes uint8 directly. For 4567 words that is about 21 MB, small enough to keep
+# around for a whole game (a matrix of 5-letter strings would take about 1 GB).
+def pattern_matrix(guesses_u8, answers_u8, answer_counts=None):
+    if cupy is not None and cupy.cuda.is_available():
+        return gpu_pattern_matrix(guesses_u8, answers_u8)
+    # The letter counts of the answers don't depend on the guess, so count them once.
+    if answer_counts is None:
+        answer_counts = letter_counts(answers_u8)
+    if njit is not None:
+        pattern = np.empty((len(guesses_u8), len(answers_u8)), np.uint8)
+        score_matrix(guesses_u8, answers_u8, answer_counts, pattern)
+        return pattern
+    num_workers = available_cpus()
+    if num_workers > 1 and len(guesses_u8) * len(answers_u8) >= PARALLEL_MIN_SIZE:
+        # Every guess is scored independently, so each worker takes a chunk of them.
+        pattern = np.empty((len(guesses_u8), len(answers_u8)), np.uint8)
+        chunks = np.array_split(guesses_u8, num_workers)
+        context = multiprocessing.get_context(POOL_START_METHOD)
+        with ProcessPoolExecutor(num_workers, mp_context=context) as executor:
+            start = 0
+            for rows in executor.map(score_rows, chunks, [answers_u8]*num_workers, [answer_counts]*num_workers):
+                pattern[start:start + len(rows)] = rows
+                start += len(rows)
+        return pattern
+    return score_rows(guesses_u8, answers_u8, answer_counts)
+
+# The same algorithm as score(), as a CUDA kernel with one thread for every pair of
+# guess and answer. Each thread only needs its 10 letters and a 26-slot counter.
+GPU_SCORE_SOURCE = r'''
+extern "C" __global__
+void score_matrix(const unsigned char* guesses, const unsigned char* answers,
+                  int num_guesses, int num_answers, unsigned char* out)
+{
+    int ai = blockIdx.x * blockDim.x + threadIdx.x;
+    int gi = blockIdx.y;
+    if (ai >= num_answers || gi >= num_guesses)
+        return;
+    unsigned char guess[5], answer[5], state[5], lettercount[26];
+    for (int ii = 0; ii < 26; ii++)
+        lettercount[ii] = 0;
+    // Process the exact matches.
+    for (int ii = 0; ii < 5; ii++) {
+        guess[ii] = guesses[5*gi + ii];
+        answer[ii] = answers[5*ai + ii];
+        if (guess[ii] == answer[ii]) {
+            state[ii] = 2;
+        } else {
+            state[ii] = 0;
+            lettercount[answer[ii] - 65]++;
+        }
+    }
+    // Process the leftover "right letters in wrong position."
+    int code = 0;
+    for (int ii = 0; ii < 5; ii++) {
+        int letter = guess[ii] - 65;
+        if (state[ii] == 0 && lettercount[letter] > 0) {
+            state[ii] = 1;
+            lettercount[letter]--;
+        }
+        code = code*3 + state[ii];
+    }
+    out[(size_t)gi * num_answers + ai] = code;
+}
+'''
+
+# Computes the pattern matrix on the GPU, and copies it back to main memory.
+def gpu_pattern_matrix(guesses_u8, answers_u8):
+    kernel = cupy.RawKernel(GPU_SCORE_SOURCE, 'score_matrix')
+    num_guesses, num_answers = len(guesses_u8), len(answers_u8)
+    guesses_gpu = cupy.asarray(np.ascontiguousarray(guesses_u8))
+    answers_gpu = cupy.asarray(np.ascontiguousarray(answers_u8))
+    pattern_gpu = cupy.empty((num_guesses, num_answers), cupy.uint8)
+    grid = ((num_answers + GPU_BLOCK_SIZE - 1) // GPU_BLOCK_SIZE, num_guesses)
+    kernel(grid, (GPU_BLOCK_SIZE,), (guesses_gpu, answers_gpu,
+        np.int32(num_guesses), np.int32(num_answers), pattern_gpu))
+    return cupy.asnumpy(pattern_gpu)
+
+# Returns the number of CPUs this process may run on, which can be fewer than the
+# machine has (e.g. in a container, or under taskset).
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# The numpy version of pattern_matrix, used when numba isn't available.
+def score_rows(guesses_u8, answers_u8, answer_counts):
+    pattern = np.empty((len(guesses_u8), len(answers_u8)), np.uint8)
+    for ii in range(len(guesses_u8)):
+        pattern[ii] = score_batch(guesses_u8[ii], answers_u8, answer_counts)
+    return pattern
+
+# The same algorithm as score(), compiled with numba, for every guess against every
+# answer. The result codes are written into 'out', which has shape (G,N).
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def score_matrix(guesses_u8, answers_u8, answer_counts, out):
+        num_guesses = guesses_u8.shape[0]
+        num_blocks = (num_guesses + GUESS_BLOCK - 1) // GUESS_BLOCK
+        for bi in prange(num_blocks):
+            first = bi * GUESS_BLOCK
+            last = min(first + GUESS_BLOCK, num_guesses)
+            lettercount = np.zeros(26, np.uint8)
+            state = np.zeros(5, np.uint8)
+            # Most guesses have no repeated letters, which lets us use the same shortcut
+            # as score() for them.
+            distinct = np.ones(last - first, np.bool_)
+            for gi in range(first, last):
+                for ii in range(5):
+                    for jj in range(ii + 1, 5):
+                        if guesses_u8[gi, ii] == guesses_u8[gi, jj]:
+                            distinct[gi - first] = False
+            for ai in range(answers_u8.shape[0]):
+                lettercount[:] = answer_counts[ai]
+                answer_mask = 0
+                for ii in range(5):
+                    answer_mask |= 1 << (answers_u8[ai, ii] - 65)
+                for gi in range(first, last):
+                    if distinct[gi - first]:
+                        code = 0
+                        for ii in range(5):
+                            if guesses_u8[gi, ii] == answers_u8[ai, ii]:
+                                code = code*3 + GREEN
+                            else:
+                                code = code*3 + ((answer_mask >> (guesses_u8[gi, ii] - 65)) & 1)
+                        out[gi, ai] = code
+                        continue
+                    # Process the exact matches.
+                    for ii in range(5):
+                        if guesses_u8[gi, ii] == answers_u8[ai, ii]:
+                            state[ii] = GREEN
+                            lettercount[answers_u8[ai, ii] - 65] -= 1
+                        else:
+                            state[ii] = GREY
+                    # Process the leftover "right letters in wrong position."
+                    code = 0
+                    for ii in range(5):
+                        letter = guesses_u8[gi, ii] - 65
+                        if state[ii] == GREY and lettercount[letter] > 0:
+                            state[ii] = YELLOW
+                            lettercount[letter] -= 1
+                        code = code*3 + state[ii]
+                    out[gi, ai] = code
+                    # Give back the letters we used up, ready for the next guess.
+                    for ii in range(5):
+                        if state[ii] != GREY:
+                            lettercount[guesses_u8[gi, ii] - 65] += 1
+
+# Converts a list of N words into an (N,5) array of uint8 character codes.
+def encode_words(words):
+    return np.frombuffer(''.join(words).encode(), np.uint8).reshape(-1, 5)
+
+# Returns an (N,26) array counting how many times each letter appears in each word.
+def letter_counts(words_u8):
+    counts = np.zeros((len(words_u8), 26), np.uint8)
+    rows = np.arange(len(words_u8))[:, np.newaxis]
+    np.add.at(counts, (rows, words_u8 - ord('A')), 1)
+    return counts
+
+# Returns an (N,) int32 array where bit k is set if letter k ('A' = 0) is in the word.
+def letter_masks(words_u8):
+    masks = np.zeros(len(words_u8), np.int32)
+    for ii in range(5):
+        masks |= np.left_shift(1, words_u8[:, ii] - ord('A'), dtype=np.int32)
+    return masks
+
+# In these functions, 'result' may be either a result string like "s.a.." or the
+# integer code returned by score().
 def word_still_feasible(possible_answer, guess, result):
+    if isinstance(result, str):
+        result = encode_pattern(result)
     return score(guess, possible_answer) == result
 
+# Returns a boolean mask of the feasible words that would still be feasible after
+# 'guess' came back with 'result'.
+def still_feasible_mask(feasible_words, guess, result):
+    if isinstance(result, str):
+        result = encode_pattern(result)
+    return score_batch(encode_words([guess])[0], encode_words(feasible_words)) == result
+
 def still_feasible(feasible_words, guess, result):
-    return [answer for answer in feasible_words if word_still_feasible(answer, guess, result)]
+    keep = still_feasible_mask(feasible_words, guess, result)
+    return [answer for answer, ok in zip(feasible_words, keep) if ok]
 
 def num_still_feasible(feasible_words, guess, result):
-    # TODO: Improve efficiency by counting the number of feasible words remaining
-    # without actually constructing the list.
-    return len(still_feasible(feasible_words, guess, result))
+    return np.count_nonzero(still_feasible_mask(feasible_words, guess, result))
+
+# Given the result codes of one guess against every feasible answer, returns the
+# expected number of answers that will still be feasible after making that guess.
+def expected_remaining(results):
+    # Each answer leaves feasible exactly those answers that produce the same result,
+    # so if c_k answers produce result k, then those answers each leave c_k words
+    # feasible. Summing over all answers gives sum(c_k^2), and there is no need to
+    # filter any lists.
+    counts = np.bincount(results, minlength=NUM_PATTERNS).astype(np.int64)
+    return (counts @ counts) / len(results)
 
 def evaluate_guess(guess, feasible_words):
-    expected_num_remaining = 0
-    for answer in feasible_words:
-        expected_num_remaining += num_still_feasible(feasible_words, guess, score(guess, answer))
-    expected_num_remaining /= len(feasible_words)
-    return expected_num_remaining
+    # Score the guess against every feasible answer in one go.
+    return expected_remaining(score_batch(encode_words([guess])[0], encode_words(feasible_words)))
 
-def best_guess(reasonable_guesses, feasible_words):
+# 'pattern' may be given if the result codes of the reasonable guesses against the
+# feasible words are already known (see pattern_matrix).
+def best_guess(reasonable_guesses, feasible_words, pattern=None):
+    if pattern is None:
+        # Score every guess against every feasible answer up front. Often the two lists
+        # are the same, in which case we only need to encode them once.
+        feasible_u8 = encode_words(feasible_words)
+        if reasonable_guesses is feasible_words:
+            guesses_u8 = feasible_u8
+        else:
+            guesses_u8 = encode_words(reasonable_guesses)
+        pattern = pattern_matrix(guesses_u8, feasible_u8)
+    # In general, it can be advantageous to try guesses that we know are not feasible,
+    # if they can limit the future search space. But when a feasible guess is just as
+    # good, we should prefer it, because it might turn out to be the answer.
+    feasible_set = set(feasible_words)
     best_score = float('inf')
     best_guess = None
-    progress_iterator = tqdm(reasonable_guesses)
-    for guess in progress_iterator:
-        expected_num_remaining = evaluate_guess(guess, feasible_words)
-        if expected_num_remaining < best_score:
+    best_is_feasible = False
+    progress_iterator = tqdm(range(len(reasonable_guesses)))
+    for ii in progress_iterator:
+        guess = reasonable_guesses[ii]
+        expected_num_remaining = expected_remaining(pattern[ii])
+        is_better = expected_num_remaining < best_score - TIE_EPSILON
+        is_tie = abs(expected_num_remaining - best_score) <= TIE_EPSILON
+        if is_better or (is_tie and not best_is_feasible and guess in feasible_set):
             best_guess = guess
             best_score = expected_num_remaining
+            best_is_feasible = guess in feasible_set
             progress_iterator.clear()
             print("New best guess is " + best_guess + " with " + str(best_score))
 
     return best_guess
 
-def reasonable_guesses(words, guess, result):
+# Returns a boolean mask of the words (given by their letter_masks) that don't contain
+# any of the letters that came back grey in 'result'. A repeated letter can come back
+# grey and also green or yellow, in which case it is in the answer after all, and
+# we must not rule out the words containing it (that would include the answer).
+def reasonable_guess_mask(masks, guess, result):
+    bad_mask = 0
+    good_mask = 0
     for ii in range(5):
+        bit = 1 << (ord(guess[ii].upper()) - ord('A'))
         if result[ii] == '.':
-            words = [word for word in words if guess[ii].upper() not in word]
-    return words
+            bad_mask |= bit
+        else:
+            good_mask |= bit
+    return (masks & bad_mask & ~good_mask) == 0
+
+def reasonable_guesses(words, guess, result):
+    keep = reasonable_guess_mask(letter_masks(encode_words(words)), guess, result)
+    return [word for word, ok in zip(words, keep) if ok]
+
 
+# Matches the lines of the dictionary that are five-letter words in the allowed
+# character set.
+import re
+WORD_PATTERN = re.compile(r"^[a-z]{5}$", re.MULTILINE)
 
 def read_word_list(filename):
+    # Read the whole file at once and let the regex find the words, rather than
+    # looking at it line by line. Text mode turns any "\r\n" line endings into "\n".
     with open(filename) as f:
-        words = f.readlines()
-    # Strip newline characters
-    words = [word[0:-1] for word in words]
-
-    # Select five-letter words in the allowed character set.
-    import re
-    words = [word.upper() for word in words if re.match("^[a-z][a-z][a-z][a-z][a-z]$", word)]
+        data = f.read()
+    words = [word.upper() for word in WORD_PATTERN.findall(data)]
     print("Loaded %d words." % len(words))
     return words
 
@@ -171,7 +527,7 @@ class WordlGame:
 
     def guess(self, word):
         self.n_guesses += 1
-        result = score(word, self.answer)
+        result = decode_pattern(score(word, self.answer), word)
         print('Guess #%d: ' % self.n_guesses + word + " --> " + result)
         self.solved = (word == self.answer)
         if self.solved:
@@ -180,50 +536,74 @@ class WordlGame:
 
 # A wordl solver, which suggests what to guess next.
 class WordlSolver:
-    def __init__(self, words):
+    def __init__(self, words, pattern_full=None):
         # Store the dictionary so that we can reset the solver later.
         self.words = words
+        self.words_u8 = encode_words(words)
+        self.word_to_idx = {word: ii for ii, word in enumerate(words)}
+        self.letter_counts = letter_counts(self.words_u8)
+        self.letter_masks = letter_masks(self.words_u8)
         print("%d words loaded." % len(self.words))
-        # List of possible solutions that are still feasible.
-        self.feasible = words
-        # List of words that would be reasonable to guess.
-        self.guesses = words
-        
-        # Unfortunately the solver is too slow to come up with an initial guess,
-        # so we hardcode one.
-        self.next_guess = 'SLANT'
+        # The result of every word as a guess against every word as an answer. This
+        # only needs to be computed once: after each guess, we just look at a smaller
+        # part of it.
+        if pattern_full is None:
+            print("Computing the pattern matrix...")
+            # Every word is both a guess and an answer here, so the answers' letter
+            # counts are just the dictionary's, which we count once and keep.
+            pattern_full = pattern_matrix(self.words_u8, self.words_u8, self.letter_counts)
+        self.pattern_full = pattern_full
+        # Indices (into self.words) of possible solutions that are still feasible.
+        self.feasible_idx = np.arange(len(words))
+        # Indices (into self.words) of words that would be reasonable to guess.
+        self.guess_idx = np.arange(len(words))
+
+        # With the pattern matrix in hand, finding the best initial guess is cheap.
+        self.think()
        
+    # The solver works with indices internally; these give the words themselves.
+    @property
+    def feasible(self):
+        return [self.words[ii] for ii in self.feasible_idx]
+
+    @property
+    def guesses(self):
+        return [self.words[ii] for ii in self.guess_idx]
+
     def reset(self):
         print("Resetting the solver.")
-        self.__init__(self.words)
+        score.cache_clear()
+        self.__init__(self.words, self.pattern_full)
 
     def apply_result(self, guess, result):
-        self.feasible = still_feasible(self.feasible, guess, result)
-        print("%d words still feasible:" % len(self.feasible),)
+        guess = guess.upper()
+        if guess in self.word_to_idx:
+            results = self.pattern_full[self.word_to_idx[guess], self.feasible_idx]
+        else:
+            # The guess isn't in our dictionary, so we have to score it ourselves. The
+            # feasible words are a subset of the dictionary, so we can pick their letter
+            # counts out of the ones we already have.
+            results = score_batch(encode_words([guess])[0], self.words_u8[self.feasible_idx],
+                                  self.letter_counts[self.feasible_idx])
+        self.feasible_idx = self.feasible_idx[results == encode_pattern(result)]
+        print("%d words still feasible:" % len(self.feasible_idx),)
         print(self.feasible)
 
         # It can be useful to try a known-infeasible guess. But often, because this program is so slow,
         # it takes too long to evaluate _all_ possible guesses. Here we cut down the list of possible
         # guesses slightly by removing possible guesses that contain letters that we already know are
         # not in the solution.
-        self.guesses = reasonable_guesses(self.guesses, guess, result)
+        keep = reasonable_guess_mask(self.letter_masks[self.guess_idx], guess, result)
+        self.guess_idx = self.guess_idx[keep]
     
     def think(self):
-        if len(self.feasible) == 1:
+        if len(self.feasible_idx) == 1:
             # Don't bother searching if there is only one option.
-            guess = self.feasible[0]
-
-        # elif len(self.feasible) < 10:
-        #     # In general, it can be advantageous to try guesses that we know are not feasible,
-        #     # if they can limit the future search space. But it is dumb to try a known-infeasible
-        #     # guess if the number of feasible solutions is very small. It would be better to 
-        #     # fix "best_guess" to break ties by choosing a feasible answer where possible, but
-        #     # in the meantime here's a hack.
-        #     guess = best_guess(self.feasible, self.feasible)
-
-        else: 
-            print("%d words in reasonable guess list" % len(self.guesses))
-            guess = best_guess(self.guesses, self.feasible)
+            guess = self.words[self.feasible_idx[0]]
+        else:
+            print("%d words in reasonable guess list" % len(self.guess_idx))
+            pattern = self.pattern_full[np.ix_(self.guess_idx, self.feasible_idx)]
+            guess = best_guess(self.guesses, self.feasible, pattern)
 
         self.next_guess = guess
         return self.next_guess
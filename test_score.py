@@ -1,17 +1,104 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 
-from autowordl import score
+import numpy as np
+
+import autowordl
+
+from autowordl import score, score_batch, pattern_matrix, best_guess, encode_words, encode_pattern, decode_pattern
+from autowordl import word_still_feasible, still_feasible, num_still_feasible, WordlSolver
+from autowordl import reasonable_guesses, read_word_list
 
 class TestScore(unittest.TestCase):
     def test_nomatch(self):
-        self.assertEqual(score('BATHE','SPOON'), '.....')
+        self.assertEqual(decode_pattern(score('BATHE','SPOON'), 'BATHE'), '.....')
     
     def test_fullmatch(self):
-        self.assertEqual(score('TRYST', 'TRYST'), 'TRYST')
+        self.assertEqual(decode_pattern(score('TRYST', 'TRYST'), 'TRYST'), 'TRYST')
 
     def test_multiple(self):
         # this was an error in the old code
-        self.assertEqual(score('DRINK', 'DANDY'), 'D..n.')
+        self.assertEqual(decode_pattern(score('DRINK', 'DANDY'), 'DRINK'), 'D..n.')
+
+    def test_encode_pattern(self):
+        self.assertEqual(encode_pattern('..LIa'), score('CILIA', 'VALID'))
+        self.assertEqual(encode_pattern('.....'), 0)
+        self.assertEqual(encode_pattern('TRYST'), 242)
+
+class TestScoreBatch(unittest.TestCase):
+    def test_matches_score(self):
+        guess = 'CILIA'
+        answers = ['VALID', 'DANDY', 'CILIA', 'LILAC', 'SPOON']
+        results = score_batch(encode_words([guess])[0], encode_words(answers))
+        self.assertEqual(list(results), [score(guess, answer) for answer in answers])
+
+    def test_pattern_matrix(self):
+        guesses = ['CILIA', 'DRINK', 'SLANT']
+        answers = ['VALID', 'DANDY', 'CILIA', 'LILAC', 'SPOON']
+        pattern = pattern_matrix(encode_words(guesses), encode_words(answers))
+        self.assertEqual(pattern.dtype, np.uint8)
+        self.assertEqual(pattern.tolist(), [[score(guess, answer) for answer in answers] for guess in guesses])
+
+    def test_pattern_matrix_process_pool(self):
+        answers_u8 = encode_words(['VALID', 'DANDY', 'CILIA', 'LILAC', 'SPOON'])
+        answer_counts = autowordl.letter_counts(answers_u8)
+        with mock.patch.object(autowordl, 'njit', None), \
+             mock.patch.object(autowordl, 'cupy', None), \
+             mock.patch.object(autowordl, 'PARALLEL_MIN_SIZE', 0), \
+             mock.patch.object(autowordl, 'available_cpus', lambda: 3):
+            # Also try fewer guesses than workers, which leaves some chunks empty.
+            for guesses in [['CILIA', 'DRINK', 'SLANT', 'TRYST', 'BATHE'], ['CILIA', 'DRINK']]:
+                guesses_u8 = encode_words(guesses)
+                pattern = pattern_matrix(guesses_u8, answers_u8)
+                expected = autowordl.score_rows(guesses_u8, answers_u8, answer_counts)
+                self.assertEqual(pattern.dtype, np.uint8)
+                self.assertEqual(pattern.tolist(), expected.tolist())
+
+class TestStillFeasible(unittest.TestCase):
+    def test_result_string(self):
+        self.assertEqual(still_feasible(['BARES', 'MARES', 'CARES'], 'CARES', '.ARES'), ['BARES', 'MARES'])
+        self.assertEqual(num_still_feasible(['BARES', 'MARES'], 'WOMBS', '..m.S'), 1)
+        self.assertTrue(word_still_feasible('MARES', 'WOMBS', '..m.S'))
+
+    def test_result_code(self):
+        code = score('WOMBS', 'MARES')
+        self.assertEqual(still_feasible(['BARES', 'MARES', 'WARES'], 'WOMBS', code), ['MARES'])
+
+class TestReasonableGuesses(unittest.TestCase):
+    def test_grey_letters(self):
+        self.assertEqual(reasonable_guesses(['SPEED', 'ABCDE', 'XYZZY'], 'SLANT', '.....'), ['XYZZY'])
+
+    def test_repeated_letter(self):
+        # The last two E's come back grey, but the first is green, so E is in the answer.
+        self.assertEqual(reasonable_guesses(['SPEED', 'ABCDE', 'XYZZY'], 'EERIE', 'E....'), ['SPEED', 'ABCDE', 'XYZZY'])
+
+class TestBestGuess(unittest.TestCase):
+    def test_prefers_feasible_on_tie(self):
+        # Both guesses tell the two answers apart, but only BARES could be the answer.
+        self.assertEqual(best_guess(['BMXYZ', 'BARES'], ['BARES', 'MARES']), 'BARES')
+
+class TestWordlSolver(unittest.TestCase):
+    def test_apply_result(self):
+        solver = WordlSolver(['BARES', 'MARES', 'WARES', 'WOMBS', 'CARES'])
+        solver.apply_result('CARES', '.ARES')
+        self.assertEqual(solver.feasible, ['BARES', 'MARES', 'WARES'])
+        self.assertEqual(solver.guesses, ['BARES', 'MARES', 'WARES', 'WOMBS'])
+        # MXXXX isn't in the dictionary, so the solver has to score it itself.
+        solver.apply_result('MXXXX', 'M....')
+        self.assertEqual(solver.feasible, ['MARES'])
+        self.assertEqual(solver.guesses, ['BARES', 'MARES', 'WARES', 'WOMBS'])
+        self.assertEqual(solver.think(), 'MARES')
+
+class TestReadWordList(unittest.TestCase):
+    def test_line_endings(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+            f.write(b"slant\nApple\ncares\r\nabc\nbares\r\nwombs")
+        try:
+            self.assertEqual(read_word_list(f.name), ['SLANT', 'CARES', 'BARES', 'WOMBS'])
+        finally:
+            os.remove(f.name)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file